@@ -6,66 +6,196 @@ SOP Analyzer - Приложение для анализа .sop файлов
 import json
 import zipfile
 import zlib
-import argparse
+import logging
+import os
+import stat
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
-import datetime
+from typing import List, Dict, Any, Optional, Tuple, Callable, BinaryIO, Iterable, Mapping
+from dataclasses import dataclass, replace
+from functools import cached_property, partial, lru_cache
+from collections import Counter, defaultdict
+from types import MappingProxyType, SimpleNamespace
 
-@dataclass
+try:
+    import orjson
+except ImportError:  # orjson не установлен - используем стандартный json
+    orjson = None
+
+try:
+    import deflate
+except ImportError:  # deflate (libdeflate) не установлен - используем zlib
+    deflate = None
+
+# Каталог кэша разобранных данных SOP файлов
+CACHE_DIR = Path.home() / '.cache' / 'sop_analyzer'
+
+# Размер блока при потоковом чтении .data файла из архива
+STREAM_CHUNK_SIZE = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _import_diskcache():
+    """Модуль diskcache или None, если он не установлен (кэш тогда отключен)"""
+    # Импорт по требованию: diskcache тянет sqlite3, а кэш нужен не при каждом запуске
+    try:
+        import diskcache
+    except ImportError:
+        return None
+    return diskcache
+
+
+def _json_loads(data: bytes) -> Any:
+    """Разбор JSON из байтов (через orjson, если он установлен)"""
+    if orjson is not None:
+        # orjson принимает bytes напрямую, без промежуточной строки
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson строже стандартного парсера (например, не принимает NaN):
+            # такие данные разбираем json, как и без orjson
+            pass
+    return json.loads(data.decode('utf-8'))
+
+
+def _json_dumps(obj: Any) -> bytes:
+    """Сериализация в JSON байты (через orjson, если он установлен)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+@dataclass(slots=True)
 class RecordStats:
     """Статистика по записям"""
     total: int = 0
     deletes: int = 0
     strong_overwrites: int = 0
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TableInfo:
     """Информация о таблице"""
     name: str
     record_count: int
-    actions: Dict[str, int]
+    actions: Mapping[str, int]
 
 class SOPAnalyzer:
     """Анализатор SOP файлов"""
     
-    def __init__(self, sop_file_path: str):
+    def __init__(self, sop_file_path: str, use_cache: bool = True,
+                 file_stat: Optional[os.stat_result] = None):
         self.sop_file_path = Path(sop_file_path)
+        # Единственный stat файла (или уже готовый от вызывающего кода);
+        # если файла нет - FileNotFoundError
+        self._stat = file_stat if file_stat is not None else self.sop_file_path.stat()
+        self.use_cache = use_cache
         self._data = None
+        self._raw_info = None
+    
+    @property
+    def file_size(self) -> int:
+        """Размер SOP файла в байтах"""
+        return self._stat.st_size
     
     def load_data(self) -> Dict[str, Any]:
         """Загрузка и декодирование данных из SOP файла"""
         if self._data is not None:
             return self._data
-            
-        if not self.sop_file_path.exists():
-            raise FileNotFoundError(f"SOP файл не найден: {self.sop_file_path}")
         
+        # Ключ кэша меняется при любом изменении файла
+        cache_key = None
+        if self.use_cache and _import_diskcache() is not None:
+            cache_key = (str(self.sop_file_path.resolve()), self._stat.st_mtime_ns, self._stat.st_size)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                try:
+                    self._data = _json_loads(cached)
+                    return self._data
+                except (ValueError, TypeError) as e:
+                    # Поврежденная запись - как промах: читаем файл и перезаписываем ее
+                    logger.debug("Некорректная запись кэша: %s", e)
+        
+        self._data = self._read_data()
+        
+        if cache_key is not None:
+            self._cache_set(cache_key, self._data)
+        
+        return self._data
+    
+    def _read_data(self) -> Dict[str, Any]:
+        """Чтение, декомпрессия и разбор .data файла из архива"""
         try:
             with zipfile.ZipFile(self.sop_file_path, 'r') as sop_zip:
                 # Ищем файл с данными
-                data_files = [f for f in sop_zip.namelist() if f.endswith('.data')]
-                if not data_files:
+                files_in_archive = sop_zip.namelist()
+                data_file_name = next((f for f in files_in_archive if f.endswith('.data')), None)
+                if data_file_name is None:
                     raise ValueError("В архиве не найден файл с данными (.data)")
                 
-                # Читаем данные из .data файла
-                with sop_zip.open(data_files[0]) as data_file:
-                    compressed_data = data_file.read()
+                # Распаковываем .data файл потоком, не держа в памяти сжатые
+                # данные целиком. Исключение - GZIP при наличии libdeflate: размер
+                # результата известен из заголовка, и распаковка целиком быстрее
+                decompressed_data = None
+                with sop_zip.open(data_file_name) as data_file:
+                    if deflate is None or self._detect_wbits(data_file.peek(2)) != 16 + 15:
+                        decompressed_data = self._stream_decompress(data_file, files_in_archive)
                 
-                # Пробуем разные методы декомпрессии
-                decompressed_data = self._decompress_data(compressed_data)
-                self._data = json.loads(decompressed_data.decode('utf-8'))
+                if decompressed_data is None:
+                    # Читаем данные из .data файла и пробуем разные методы декомпрессии
+                    with sop_zip.open(data_file_name) as data_file:
+                        compressed_data = data_file.read()
+                    # Запоминаем диагностику до декомпрессии - она нужна именно при ошибках
+                    self._raw_info = self._make_raw_info(
+                        len(compressed_data), compressed_data[:10], compressed_data[-10:], files_in_archive
+                    )
+                    decompressed_data = self._decompress_data(compressed_data)
+                    del compressed_data
                 
-                return self._data
+                return _json_loads(decompressed_data)
                 
         except zipfile.BadZipFile:
             raise ValueError("Некорректный ZIP архив")
         except json.JSONDecodeError as e:
+            # orjson.JSONDecodeError является подклассом json.JSONDecodeError
             raise ValueError(f"Ошибка парсинга JSON: {e}")
     
+    @staticmethod
+    def _cache_get(key: Tuple[str, int, int]) -> Optional[bytes]:
+        """Получить разобранные данные из кэша"""
+        try:
+            with _import_diskcache().Cache(CACHE_DIR) as cache:
+                return cache.get(key)
+        except Exception as e:
+            # Кэш не обязателен для анализа - при ошибке просто читаем файл
+            logger.debug("Кэш недоступен: %s", e)
+            return None
+    
+    @staticmethod
+    def _cache_set(key: Tuple[str, int, int], data: Dict[str, Any]):
+        """Сохранить разобранные данные в кэш"""
+        try:
+            # Сериализация тоже внутри try: например, orjson.dumps ограничивает
+            # глубину вложенности сильнее, чем orjson.loads
+            value = _json_dumps(data)
+            with _import_diskcache().Cache(CACHE_DIR) as cache:
+                cache.set(key, value)
+        except Exception as e:
+            logger.debug("Не удалось сохранить данные в кэш: %s", e)
+    
     def _decompress_data(self, compressed_data: bytes) -> bytes:
         """Декомпрессия данных с использованием различных методов"""
+        # Сначала метод, определенный по заголовку - обычно он и подходит
+        detected = self._detect_method(compressed_data)
+        try:
+            result = detected(compressed_data)
+            logger.debug("Успешная декомпрессия методом: %s", detected.__name__)
+            return result
+        except Exception as e:
+            logger.debug("Метод %s не сработал: %s", detected.__name__, e)
+            last_error = e
+        
         methods = [
             self._try_raw_deflate,
             self._try_zlib_deflate,
@@ -74,15 +204,68 @@ class SOPAnalyzer:
         ]
         
         for method in methods:
+            if method == detected:
+                continue
             try:
                 result = method(compressed_data)
-                print(f"✓ Успешная декомпрессия методом: {method.__name__}")
+                logger.debug("Успешная декомпрессия методом: %s", method.__name__)
                 return result
             except Exception as e:
-                print(f"✗ Метод {method.__name__} не сработал: {e}")
-                continue
+                logger.debug("Метод %s не сработал: %s", method.__name__, e)
+                last_error = e
+        
+        raise ValueError("Не удалось декомпрессировать данные ни одним из методов") from last_error
+    
+    def _stream_decompress(self, data_file: BinaryIO, files_in_archive: List[str]) -> Optional[bytearray]:
+        """Потоковая декомпрессия методом, определенным по заголовку"""
+        chunk = data_file.read(STREAM_CHUNK_SIZE)
+        wbits = self._detect_wbits(chunk)
+        decompressor = zlib.decompressobj(wbits)
+        out = bytearray()
+        
+        # Диагностика собирается по ходу чтения, без повторного открытия архива
+        first_bytes = chunk[:10]
+        last_bytes = b''
+        size = 0
+        
+        try:
+            while chunk:
+                size += len(chunk)
+                last_bytes = (last_bytes + chunk[-10:])[-10:]
+                out += decompressor.decompress(chunk)
+                chunk = data_file.read(STREAM_CHUNK_SIZE)
+            out += decompressor.flush()
+        except zlib.error as e:
+            logger.debug("Потоковая декомпрессия (wbits=%d) не сработала: %s", wbits, e)
+            return None
         
-        raise ValueError("Не удалось декомпрессировать данные ни одним из методов")
+        if not decompressor.eof:
+            logger.debug("Потоковая декомпрессия (wbits=%d) не сработала: поток обрезан", wbits)
+            return None
+        
+        self._raw_info = self._make_raw_info(size, first_bytes, last_bytes, files_in_archive)
+        logger.debug("Успешная потоковая декомпрессия (wbits=%d)", wbits)
+        return out
+    
+    @staticmethod
+    def _detect_wbits(data: bytes) -> int:
+        """Определение формата сжатия по первым байтам (значение wbits для zlib)"""
+        header = data[:2]
+        if header == b'\x1f\x8b':
+            return 16 + 15
+        # Zlib: CM=8 с окном 32K (0x78) и корректная контрольная сумма FCHECK
+        if len(header) == 2 and header[0] == 0x78 and (header[0] << 8 | header[1]) % 31 == 0:
+            return 15
+        return -15
+    
+    def _detect_method(self, data: bytes) -> Callable[[bytes], bytes]:
+        """Определение метода декомпрессии по первым байтам"""
+        wbits = self._detect_wbits(data)
+        if wbits == 16 + 15:
+            return self._try_gzip
+        if wbits == 15:
+            return self._try_zlib_deflate
+        return self._try_raw_deflate
     
     def _try_raw_deflate(self, data: bytes) -> bytes:
         """Попытка RAW Deflate декомпрессии"""
@@ -92,6 +275,13 @@ class SOPAnalyzer:
         """Попытка Zlib декомпрессии"""
         return zlib.decompress(data)
     
+    def _try_gzip(self, data: bytes) -> bytes:
+        """Попытка GZIP декомпрессии"""
+        if deflate is not None:
+            # Размер результата libdeflate берет из поля ISIZE в конце потока
+            return deflate.gzip_decompress(data)
+        return zlib.decompress(data, 16 + 15)
+    
     def _try_gzip_format(self, data: bytes) -> bytes:
         """Попытка декомпрессии как GZIP с заголовком"""
         # Добавляем простой gzip заголовок
@@ -123,8 +313,9 @@ class SOPAnalyzer:
         
         raise ValueError("Все методы с заголовками не сработали")
     
-    def get_metadata(self) -> Dict[str, Any]:
-        """Получить метаданные пакета"""
+    @cached_property
+    def metadata(self) -> Dict[str, Any]:
+        """Метаданные пакета"""
         data = self.load_data()
         return {
             'name': data.get('name', 'Неизвестно'),
@@ -133,145 +324,226 @@ class SOPAnalyzer:
             'version': data.get('version', 'Неизвестно')
         }
     
-    def analyze_records(self) -> RecordStats:
-        """Анализ статистики записей"""
-        data = self.load_data()
-        records = data.get('records', [])
+    @cached_property
+    def _record_scan(self) -> Tuple[RecordStats, Counter, Dict[str, Counter], Counter]:
+        """Один проход по записям: статистика, записи и действия по таблицам, действия"""
+        records = self.load_data().get('records', [])
         
-        stats = RecordStats(total=len(records))
-        
-        for record in records:
-            if record.get('action') == 'delete':
-                stats.deletes += 1
-            if record.get('is_strong_overwrite') is True:
-                stats.strong_overwrites += 1
+        # Гистограмма по ключам (таблица, действие, сильная перезапись):
+        # подсчет по записям выполняет Counter на C, итоги по таблицам и
+        # действиям считаются уже по уникальным ключам, которых на порядки
+        # меньше, чем записей
+        histogram = Counter(
+            (
+                record.get('table_name', 'unknown'),
+                record.get('action', 'unknown'),
+                record.get('is_strong_overwrite') is True
+            )
+            for record in records
+        )
         
-        return stats
-    
-    def analyze_tables(self) -> List[TableInfo]:
-        """Анализ таблиц и их записей"""
-        data = self.load_data()
-        records = data.get('records', [])
+        strong_overwrites = 0
+        table_counts = Counter()
+        table_actions = defaultdict(Counter)
+        actions = Counter()
         
-        tables = {}
+        for (table_name, action, is_strong), count in histogram.items():
+            table_counts[table_name] += count
+            table_actions[table_name][action] += count
+            actions[action] += count
+            strong_overwrites += count * is_strong
         
-        for record in records:
-            table_name = record.get('table_name', 'unknown')
-            action = record.get('action', 'unknown')
-            
-            if table_name not in tables:
-                tables[table_name] = {'count': 0, 'actions': {}}
-            
-            tables[table_name]['count'] += 1
-            tables[table_name]['actions'][action] = tables[table_name]['actions'].get(action, 0) + 1
+        stats = RecordStats(
+            total=len(records),
+            deletes=actions.get('delete', 0),
+            strong_overwrites=strong_overwrites
+        )
+        return stats, table_counts, table_actions, actions
+    
+    @cached_property
+    def record_stats(self) -> RecordStats:
+        """Статистика записей"""
+        return self._record_scan[0]
+    
+    @cached_property
+    def table_infos(self) -> Tuple[TableInfo, ...]:
+        """Таблицы и их записи, по убыванию числа записей (неизменяемый кортеж)"""
+        _, table_counts, table_actions, _ = self._record_scan
         
         # Сортируем таблицы по количеству записей
-        sorted_tables = sorted(tables.items(), key=lambda x: x[1]['count'], reverse=True)
+        sorted_tables = table_counts.most_common()
         
-        return [
+        return tuple(
             TableInfo(
                 name=table_name,
-                record_count=table_data['count'],
-                actions=table_data['actions']
+                record_count=record_count,
+                actions=MappingProxyType(dict(table_actions[table_name]))
             )
-            for table_name, table_data in sorted_tables
-        ]
+            for table_name, record_count in sorted_tables
+        )
+    
+    @cached_property
+    def actions_summary(self) -> Dict[str, int]:
+        """Сводка по действиям"""
+        return dict(self._record_scan[3])
+    
+    # Методы ниже возвращают копии кэшированных результатов, чтобы изменения
+    # у вызывающего кода не попадали в последующие вызовы и отчеты
+    
+    def get_metadata(self) -> Dict[str, Any]:
+        """Получить метаданные пакета"""
+        return dict(self.metadata)
+    
+    def analyze_records(self) -> RecordStats:
+        """Анализ статистики записей"""
+        return replace(self.record_stats)
+    
+    def analyze_tables(self) -> List[TableInfo]:
+        """Анализ таблиц и их записей"""
+        return list(self.table_infos)
     
     def get_actions_summary(self) -> Dict[str, int]:
         """Сводка по действиям"""
-        data = self.load_data()
-        records = data.get('records', [])
-        
-        actions = {}
-        for record in records:
-            action = record.get('action', 'unknown')
-            actions[action] = actions.get(action, 0) + 1
-        
-        return actions
+        return dict(self.actions_summary)
+    
+    @staticmethod
+    def _make_raw_info(size: int, first_bytes: bytes, last_bytes: bytes, files_in_archive: List[str]) -> Dict[str, Any]:
+        """Информация о сырых данных в формате get_raw_data_info"""
+        return {
+            'data_file_size': size,
+            'first_10_bytes': first_bytes.hex(),
+            'last_10_bytes': last_bytes.hex(),
+            'files_in_archive': files_in_archive
+        }
     
     def get_raw_data_info(self) -> Dict[str, Any]:
         """Получить информацию о сырых данных (для диагностики)"""
+        # Если архив уже читался в load_data, информация собрана по ходу чтения
+        if self._raw_info is not None:
+            return self._raw_info
+        
         try:
             with zipfile.ZipFile(self.sop_file_path, 'r') as sop_zip:
-                data_files = [f for f in sop_zip.namelist() if f.endswith('.data')]
-                if not data_files:
+                files_in_archive = sop_zip.namelist()
+                data_file_name = next((f for f in files_in_archive if f.endswith('.data')), None)
+                if data_file_name is None:
                     return {'error': 'No .data file found'}
                 
-                with sop_zip.open(data_files[0]) as data_file:
-                    raw_data = data_file.read()
+                # Размер берем из заголовка архива, а с данных читаем только
+                # первые и последние байты, не собирая файл целиком в памяти
+                info = sop_zip.getinfo(data_file_name)
+                with sop_zip.open(info) as data_file:
+                    first_bytes = data_file.read(10)
+                    data_file.seek(max(info.file_size - 10, 0))
+                    last_bytes = data_file.read()
                 
-                return {
-                    'data_file_size': len(raw_data),
-                    'first_10_bytes': raw_data[:10].hex(),
-                    'last_10_bytes': raw_data[-10:].hex(),
-                    'files_in_archive': sop_zip.namelist()
-                }
+                self._raw_info = self._make_raw_info(
+                    info.file_size, first_bytes, last_bytes, files_in_archive
+                )
+                return self._raw_info
         except Exception as e:
             return {'error': str(e)}
     
     def generate_report(self) -> Dict[str, Any]:
         """Генерация полного отчета"""
-        metadata = self.get_metadata()
-        record_stats = self.analyze_records()
-        tables = self.analyze_tables()
-        actions = self.get_actions_summary()
+        import datetime
+        
+        metadata = self.metadata
+        record_stats = self.record_stats
+        tables = self.table_infos
+        actions = self.actions_summary
         
         return {
-            'metadata': metadata,
+            'metadata': dict(metadata),
             'record_statistics': {
                 'total_records': record_stats.total,
                 'delete_operations': record_stats.deletes,
                 'strong_overwrites': record_stats.strong_overwrites,
-                'actions_breakdown': actions
+                'actions_breakdown': dict(actions)
             },
             'tables': [
                 {
                     'name': table.name,
                     'record_count': table.record_count,
-                    'actions': table.actions
+                    'actions': dict(table.actions)
                 }
                 for table in tables
             ],
             'file_info': {
                 'file_path': str(self.sop_file_path),
-                'file_size': self.sop_file_path.stat().st_size,
+                'file_size': self.file_size,
                 'analysis_date': datetime.datetime.now().isoformat()
             }
         }
 
 
+def _analyze_one(sop_file_path: Path, use_cache: bool = True) -> Dict[str, Any]:
+    """Отчет по одному файлу для пакетного анализа (ошибка не прерывает пакет)"""
+    try:
+        return SOPAnalyzer(sop_file_path, use_cache=use_cache).generate_report()
+    except Exception as e:
+        return {'file_info': {'file_path': str(sop_file_path)}, 'error': str(e)}
+
+
+def analyze_directory(directory: str, use_cache: bool = True) -> List[Dict[str, Any]]:
+    """Параллельный анализ всех .sop файлов каталога"""
+    # Импорт здесь: concurrent.futures.process тянет multiprocessing, а
+    # пакетный режим нужен не при каждом запуске
+    from concurrent.futures import ProcessPoolExecutor
+    
+    paths = sorted(Path(directory).glob('*.sop'))
+    if not paths:
+        return []
+    
+    workers = min(len(paths), os.cpu_count() or 1)
+    # Несколько блоков на процесс: мелкие блоки - лишние накладные расходы
+    # на пересылку задач, крупные - простой процессов в конце пакета
+    chunksize = max(1, len(paths) // (4 * workers))
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(_analyze_one, use_cache=use_cache), paths, chunksize=chunksize))
+
+
 class OutputFormatter:
     """Форматирование вывода"""
     
     @staticmethod
-    def print_table(headers: List[str], rows: List[List[str]], title: str = ""):
+    def print_table(headers: List[str], rows: Iterable[List[Any]], title: str = ""):
         """Печать таблицы"""
         if title:
             print(f"\n{title}")
             print("=" * 60)
         
-        if not rows:
+        # Один проход по строкам: приводим ячейки к str и сразу считаем ширину колонок
+        col_widths = [len(header) for header in headers]
+        table_rows = []
+        for row in rows:
+            row = [str(cell) for cell in row]
+            for i, cell in enumerate(row):
+                if len(cell) > col_widths[i]:
+                    col_widths[i] = len(cell)
+            table_rows.append(row)
+        
+        if not table_rows:
             print("Нет данных")
             return
         
-        # Вычисляем ширину колонок
-        col_widths = []
-        for i, header in enumerate(headers):
-            max_width = len(header)
-            for row in rows:
-                if i < len(row):
-                    max_width = max(max_width, len(str(row[i])))
-            col_widths.append(max_width + 2)
+        # Формат строки собирается один раз для всей таблицы
+        cell_formats = [f"{{:<{width + 2}}}" for width in col_widths]
+        line_format = "".join(cell_formats)
         
         # Печатаем заголовок
-        header_line = "".join(f"{header:<{col_widths[i]}}" for i, header in enumerate(headers))
+        header_line = line_format.format(*headers)
         print(header_line)
         print("-" * len(header_line))
         
         # Печатаем строки
-        for row in rows:
-            line = "".join(f"{str(cell):<{col_widths[i]}}" for i, cell in enumerate(row))
-            print(line)
+        for row in table_rows:
+            if len(row) < len(cell_formats):
+                # Неполная строка печатается только из имеющихся ячеек
+                print("".join(cell_formats[:len(row)]).format(*row))
+            else:
+                print(line_format.format(*row))
     
     @staticmethod
     def print_metadata(metadata: Dict[str, Any]):
@@ -302,13 +574,47 @@ class OutputFormatter:
             return
         
         headers = ["Таблица", "Записей", "Действия"]
+        rows = (
+            [table.name, table.record_count, ", ".join(f"{k}:{v}" for k, v in table.actions.items())]
+            for table in tables
+        )
+        
+        OutputFormatter.print_table(headers, rows, "🗃️ ТАБЛИЦЫ")
+    
+    @staticmethod
+    def print_batch_summary(reports: List[Dict[str, Any]]):
+        """Печать сводки по пакету файлов"""
+        headers = ["Файл", "Пакет", "Записей", "Удалений", "Перезаписей", "Таблиц"]
         rows = []
+        for report in reports:
+            file_name = Path(report['file_info']['file_path']).name
+            if 'error' in report:
+                rows.append([file_name, f"❌ {report['error']}", "", "", "", ""])
+                continue
+            stats = report['record_statistics']
+            rows.append([
+                file_name,
+                report['metadata']['name'],
+                stats['total_records'],
+                stats['delete_operations'],
+                stats['strong_overwrites'],
+                len(report['tables'])
+            ])
         
-        for table in tables:
-            actions_str = ", ".join(f"{k}:{v}" for k, v in table.actions.items())
-            rows.append([table.name, str(table.record_count), actions_str])
+        OutputFormatter.print_table(headers, rows, "📂 ПАКЕТЫ")
+    
+    @staticmethod
+    def print_json(data: Any):
+        """Печать данных в формате JSON"""
+        if orjson is None:
+            print(json.dumps(data, indent=2, ensure_ascii=False, default=str))
+            return
         
-        OutputFormatter.print_table(headers, rows, "🗃️ ТАБЛИЦЫ")
+        # orjson сериализует сразу в UTF-8 байты - пишем их напрямую в stdout
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        sys.stdout.buffer.write(b"\n")
+        sys.stdout.buffer.flush()
     
     @staticmethod
     def print_raw_data_info(info: Dict[str, Any]):
@@ -324,7 +630,26 @@ class OutputFormatter:
                 print(f"{key:>20}: {value}")
 
 
-def main():
+# Флаги командной строки: (имена опции, описание)
+CLI_FLAGS = (
+    (('--metadata',), 'Показать метаданные пакета'),
+    (('--stats',), 'Показать статистику записей'),
+    (('--tables',), 'Показать информацию о таблицах'),
+    (('--json',), 'Вывод в формате JSON'),
+    (('--debug',), 'Диагностическая информация'),
+    (('--no-cache',), 'Не использовать кэш разобранных данных'),
+    (('--verbose', '-v'), 'Подробный вывод'),
+)
+
+
+# Флаги режимов, которые относятся к одному файлу и не применимы к каталогу
+SINGLE_FILE_FLAGS = ('metadata', 'stats', 'tables', 'debug')
+
+
+def build_parser():
+    """Парсер аргументов командной строки"""
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description='SOP Analyzer - Анализ пакетов данных .sop',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -336,27 +661,59 @@ def main():
   %(prog)s package.sop --tables           # Информация о таблицах
   %(prog)s package.sop --json             # Вывод в формате JSON
   %(prog)s package.sop --debug            # Диагностическая информация
+  %(prog)s package.sop --no-cache         # Без кэша разобранных данных
+  %(prog)s packages/                      # Сводка по всем .sop файлам каталога
         """
     )
     
-    parser.add_argument('sop_file', help='Путь к .sop файлу')
-    parser.add_argument('--metadata', action='store_true', help='Показать метаданные пакета')
-    parser.add_argument('--stats', action='store_true', help='Показать статистику записей')
-    parser.add_argument('--tables', action='store_true', help='Показать информацию о таблицах')
-    parser.add_argument('--json', action='store_true', help='Вывод в формате JSON')
-    parser.add_argument('--debug', action='store_true', help='Диагностическая информация')
-    parser.add_argument('--verbose', '-v', action='store_true', help='Подробный вывод')
+    parser.add_argument('sop_file', help='Путь к .sop файлу или каталогу с .sop файлами')
+    for names, help_text in CLI_FLAGS:
+        parser.add_argument(*names, action='store_true', help=help_text)
+    
+    return parser
+
+
+def parse_args(argv: List[str]) -> Any:
+    """Разбор аргументов командной строки"""
+    # Частый случай - только путь к файлу: argparse не нужен
+    if len(argv) == 1 and not argv[0].startswith('-'):
+        flags = {names[0].lstrip('-').replace('-', '_'): False for names, _ in CLI_FLAGS}
+        return SimpleNamespace(sop_file=argv[0], **flags)
     
-    args = parser.parse_args()
+    return build_parser().parse_args(argv)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
     
-    # Проверка файла
-    if not Path(args.sop_file).exists():
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    
+    # Проверка файла: единственный stat, его результат передается анализатору
+    try:
+        file_stat = os.stat(args.sop_file)
+    except OSError:
+        # FileNotFoundError, NotADirectoryError, PermissionError и т.п.
         print(f"❌ Ошибка: Файл {args.sop_file} не найден")
         sys.exit(1)
     
+    # Пакетный режим: все .sop файлы каталога
+    if stat.S_ISDIR(file_stat.st_mode):
+        unsupported = [f"--{name}" for name in SINGLE_FILE_FLAGS if getattr(args, name)]
+        if unsupported:
+            build_parser().error(f"{', '.join(unsupported)}: не поддерживается для каталога")
+        reports = analyze_directory(args.sop_file, use_cache=not args.no_cache)
+        if args.json:
+            OutputFormatter.print_json(reports)
+        else:
+            OutputFormatter.print_batch_summary(reports)
+        if any('error' in report for report in reports):
+            sys.exit(1)
+        return
+    
+    analyzer = SOPAnalyzer(args.sop_file, use_cache=not args.no_cache, file_stat=file_stat)
+    
     try:
-        analyzer = SOPAnalyzer(args.sop_file)
-        
         # Режим отладки
         if args.debug:
             raw_info = analyzer.get_raw_data_info()
@@ -366,7 +723,7 @@ def main():
         # JSON вывод
         if args.json:
             report = analyzer.generate_report()
-            print(json.dumps(report, indent=2, ensure_ascii=False))
+            OutputFormatter.print_json(report)
             return
         
         # Выбор режима отображения
@@ -392,7 +749,7 @@ def main():
             
             if args.verbose:
                 print(f"\n📁 Файл: {args.sop_file}")
-                print(f"📏 Размер: {Path(args.sop_file).stat().st_size} байт")
+                print(f"📏 Размер: {analyzer.file_size} байт")
     
     except Exception as e:
         print(f"❌ Ошибка при анализе файла: {e}")
@@ -402,7 +759,7 @@ def main():
         
         # Показываем диагностическую информацию при ошибке
         try:
-            analyzer = SOPAnalyzer(args.sop_file)
+            # Тот же анализатор: если архив уже читался, повторно он не открывается
             raw_info = analyzer.get_raw_data_info()
             print("\n💡 Диагностическая информация:")
             OutputFormatter.print_raw_data_info(raw_info)